@@ -17,8 +17,12 @@ import random
 import time
 import asyncio
 import re
+import functools
+import heapq
+import itertools
 import aiohttp
-from typing import Dict, Optional, List
+from collections import OrderedDict
+from typing import Dict, Optional, List, Union
 from dataclasses import dataclass, field
 
 from astrbot.api import logger
@@ -31,6 +35,24 @@ try:
 except ImportError:
     AiocqhttpMessageEvent = None
 
+# 尝试导入 orjson（更快的 JSON 读写，未安装时回退到标准库 json）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 尝试导入 ujson（未安装 orjson 时的次选，都未安装时使用标准库 json）
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# 尝试导入 simdjson（按需解析歌单响应，未安装时完整解析）
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
 # 插件目录
 PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(PLUGIN_DIR, "data")
@@ -41,15 +63,93 @@ PLAYLISTS = {
     "经典": 19723756,      # 经典老歌
 }
 
+# 网易云API请求参数（各请求共用）
+NETEASE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Referer": "https://music.163.com/",
+    "Origin": "https://music.163.com",
+}
+NETEASE_COOKIES = {"appver": "2.9.11", "os": "pc"}
+NETEASE_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+# 排行榜脏数据落盘间隔（秒）
+STATS_FLUSH_INTERVAL = 5
+
+# 随机选歌时拒绝采样的最大尝试次数，超过后回退到过滤列表
+REJECTION_SAMPLE_TRIES = 8
+
+# 歌曲可用性检查：结果缓存时间（秒）、请求超时、每轮最多跳过的不可播放歌曲数
+SONG_CHECK_TTL = 3600
+SONG_CHECK_TIMEOUT = aiohttp.ClientTimeout(total=5)
+SONG_CHECK_TRIES = 3
+
+# 无进行中回合的会话超过该时间（秒）视为遗留会话，定时清理时移除
+SESSION_EXPIRE_SECONDS = 6 * 3600
+# 内存状态（会话、播放记录、排行榜缓存）清理间隔（秒），与缓存文件清理周期无关
+STATE_CLEANUP_INTERVAL = 600
+
+# 歌名/歌手名校验正则（预编译，避免每次调用都查找 re 内部缓存）
+SONG_NAME_RE = re.compile(r"[\u4e00-\u9fff]{2,7}")
+ARTIST_NAME_RE = re.compile(r"[\u4e00-\u9fff]+")
+
+# 提示用的星号串，按长度预先生成（歌名最长7字）
+HINT_STARS = tuple("＊" * i for i in range(8))
+
+# 帮助文本
+HELP_TEXT = (
+    "🎵 【猜歌游戏帮助】\n"
+    "━━━━━━━━━━━━━━━━━━\n"
+    "📌 命令列表：\n"
+    "  #猜歌 - 创建游戏\n"
+    "  🎶 - 加入游戏\n"
+    "  #开始猜歌 - 开始游戏\n"
+    "  #猜歌提示 - 获取提示\n"
+    "  #猜歌答案 - 公布答案（管理员）\n"
+    "  #猜歌结束 - 强制结束（管理员）\n"
+    "  #猜歌排行 - 查看历史排行榜\n"
+    "  #猜歌退出 - 结束游戏\n"
+    "━━━━━━━━━━━━━━━━━━\n"
+    "💡 玩法：\n"
+    "1. 发送 #猜歌 创建游戏\n"
+    "2. 群友发送 🎶 加入\n"
+    "3. 发送 #开始猜歌 开始\n"
+    "4. 直接发送歌名抢答\n"
+    "5. 答对自动下一轮！\n\n"
+    "🎭 游戏结束后：\n"
+    "最高分向最低分发起真心话/大冒险挑战！"
+)
+
+# 排名奖牌
+MEDALS = ("🥇", "🥈", "🥉")
+
+# 加入成功 / 答对的回复模板
+JOIN_SUCCESS_TEMPLATE = "✅ {nickname} {action}成功 ({count}人){tip}"
+JOIN_WAITING_TIP = "\n💡 发送「#开始猜歌」开始游戏"
+CORRECT_ANSWER_TEMPLATE = (
+    "🎉 恭喜 {nickname} 答对了！\n"
+    "答案：《{name}》- {artist}\n"
+    "本轮得分：+1  总分：{total}\n\n"
+    "正在进入下一轮..."
+)
+
+# 消息监听：命令前缀（抢答时忽略）与加入游戏的表情
+COMMAND_PREFIXES = ("#", "/")
+JOIN_EMOJI = "🎶"
+JOIN_STATES = frozenset({"waiting", "playing"})
+
+# 答案比对时需要去除的空白字符
+ANSWER_STRIP_TABLE = str.maketrans("", "", " \t\r\n")
+
 
 # ==================== 数据模型 ====================
-@dataclass
+@dataclass(slots=True)
 class GameSession:
     """游戏会话"""
     group_id: str
     status: str = "waiting"  # waiting / playing / ended
     participants: Dict[str, dict] = field(default_factory=dict)  # {user_id: {"name": str, "score": int}}
     current_song: dict = field(default_factory=dict)  # {id, name, artist}
+    answer_norm: str = ""  # 标准化后的本轮答案
     hint_level: int = 0
     round_num: int = 0
     start_time: float = 0
@@ -57,6 +157,12 @@ class GameSession:
     umo: str = ""  # unified_msg_origin 用于主动发送消息
     creator_id: str = ""  # 创建者ID
     round_answered: bool = False  # 本轮是否已被答对（只有第一个答对的人得分）
+    song_queue: List[dict] = field(default_factory=list)  # 本局待播歌曲（开局时一次性抽取）
+    next_song_task: Optional[asyncio.Task] = None  # 预取下一轮歌曲的任务
+    next_round_handle: Optional[asyncio.TimerHandle] = None  # 答对/公布答案后延迟进入下一轮的定时回调
+    next_round_task: Optional[asyncio.Task] = None  # 进入下一轮的任务
+    announce_task: Optional[asyncio.Task] = None  # 发送本轮结果的任务（保持引用，避免被回收）
+    last_active: float = field(default_factory=time.time)  # 最近一次活动时间（开始回合/收到消息）
 
 
 # ==================== 插件主类 ====================
@@ -84,12 +190,24 @@ class GuessSongPlugin(Star):
         self.cache_path = self.config.get("cache_path", "") or DATA_DIR
         self.cache_cleanup_hours = self.config.get("cache_cleanup_hours", 48)
         self.cleanup_task: Optional[asyncio.Task] = None
+        self.state_cleanup_task: Optional[asyncio.Task] = None
         
         # 歌单缓存
         self.playlist_cache: Dict[str, List[dict]] = {}
+        # 所有歌单合并后的歌曲列表（歌单加载后重建）
+        self.all_songs: List[dict] = []
+        # 歌曲可用性缓存 {song_id: (是否可播放, 检查时间)}
+        self.song_alive: Dict[int, tuple] = {}
         
-        # 已播放歌曲记录 {group_id: {song_id: timestamp}}
-        self.played_songs: Dict[str, Dict[int, float]] = {}
+        # 已播放歌曲记录 {group_id: {song_id: timestamp}}，按播放时间先后排列
+        self.played_songs: Dict[str, "OrderedDict[int, float]"] = {}
+        
+        # 排行榜内存缓存 {group_id: stats}，修改后标记脏数据定时落盘
+        self.stats_cache: Dict[str, dict] = {}
+        self.stats_dirty: set = set()
+        self.stats_flush_task: Optional[asyncio.Task] = None
+        # 排行榜文本缓存 {group_id: text}，得分写入时失效
+        self.ranking_cache: Dict[str, str] = {}
         
         # 确保数据目录存在
         os.makedirs(DATA_DIR, exist_ok=True)
@@ -100,6 +218,10 @@ class GuessSongPlugin(Star):
         self.http_session = aiohttp.ClientSession()
         # 预加载歌单
         await self._preload_playlists()
+        # 启动排行榜落盘任务
+        self.stats_flush_task = asyncio.create_task(self._run_stats_flush_task())
+        # 启动内存状态清理任务
+        self.state_cleanup_task = asyncio.create_task(self._run_state_cleanup_task())
         # 启动缓存清理任务
         if self.cache_cleanup_hours > 0:
             self.cleanup_task = asyncio.create_task(self._run_cleanup_task())
@@ -111,10 +233,18 @@ class GuessSongPlugin(Star):
         # 取消缓存清理任务
         if self.cleanup_task:
             self.cleanup_task.cancel()
-        # 取消所有超时任务
+        if self.state_cleanup_task:
+            self.state_cleanup_task.cancel()
+        # 取消排行榜落盘任务并写入剩余脏数据
+        if self.stats_flush_task:
+            self.stats_flush_task.cancel()
+        await self._flush_stats()
+        # 取消所有会话的后台任务
         for session in self.sessions.values():
-            if session.timeout_task:
-                session.timeout_task.cancel()
+            self._cancel_task(session.timeout_task)
+            self._cancel_task(session.next_song_task)
+            self._cancel_task(session.next_round_handle)
+            self._cancel_task(session.next_round_task)
         # 关闭HTTP会话
         if self.http_session:
             await self.http_session.close()
@@ -130,7 +260,57 @@ class GuessSongPlugin(Star):
             except Exception as e:
                 logger.error(f"[猜歌游戏] 缓存清理任务异常: {e}")
 
+    async def _run_state_cleanup_task(self):
+        """定时清理内存状态任务"""
+        while True:
+            try:
+                await asyncio.sleep(STATE_CLEANUP_INTERVAL)
+                self._cleanup_state()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[猜歌游戏] 内存状态清理任务异常: {e}")
+
+    def _cleanup_state(self):
+        """清理内存中的过期记录，使占用只与活跃群数量相关"""
+        # 移除24小时内无播放记录的群
+        for group_id in list(self.played_songs):
+            if not self._expire_played_songs(group_id):
+                del self.played_songs[group_id]
+        
+        # 移除长时间无活动且无进行中回合的遗留会话
+        # 已结束的会话通常由 _end_game 自行移除，结算失败遗留的同样按无活动时间清理
+        now = time.time()
+        expired_count = 0
+        for group_id, session in list(self.sessions.items()):
+            # 答对后的等待期间只有 next_round_handle，也算进行中
+            round_running = session.next_round_handle is not None or any(
+                task and not task.done() for task in (session.timeout_task, session.next_round_task)
+            )
+            if session.status != "ended" and round_running:
+                continue
+            if now - session.last_active > SESSION_EXPIRE_SECONDS:
+                self._cancel_task(session.next_song_task)
+                self._cancel_task(session.next_round_handle)
+                del self.sessions[group_id]
+                expired_count += 1
+        
+        if expired_count > 0:
+            logger.info(f"[猜歌游戏] 已清理 {expired_count} 个遗留会话")
+        
+        # 移除无进行中游戏且已落盘的排行榜缓存，下次查询时重新读取文件
+        for group_id in list(self.stats_cache):
+            if group_id not in self.stats_dirty and group_id not in self.sessions:
+                del self.stats_cache[group_id]
+        for group_id in list(self.ranking_cache):
+            if group_id not in self.stats_cache and group_id not in self.sessions:
+                del self.ranking_cache[group_id]
+
     async def _cleanup_cache(self):
+        """清理缓存文件（在线程池中执行，避免目录扫描阻塞事件循环）"""
+        await asyncio.to_thread(self._cleanup_cache_sync)
+
+    def _cleanup_cache_sync(self):
         """清理缓存文件（删除超过指定时间的文件）"""
         if not os.path.exists(self.cache_path):
             logger.warning(f"[猜歌游戏] 缓存目录不存在: {self.cache_path}")
@@ -142,24 +322,22 @@ class GuessSongPlugin(Star):
         deleted_size = 0
         
         try:
-            for filename in os.listdir(self.cache_path):
-                filepath = os.path.join(self.cache_path, filename)
-                
-                # 只处理文件，不处理目录
-                if not os.path.isfile(filepath):
-                    continue
-                
-                # 跳过非缓存文件（保留 .json 数据文件）
-                if filename.endswith('.json'):
-                    continue
-                
-                # 检查文件修改时间
-                file_mtime = os.path.getmtime(filepath)
-                if now - file_mtime > max_age:
-                    file_size = os.path.getsize(filepath)
-                    os.remove(filepath)
-                    deleted_count += 1
-                    deleted_size += file_size
+            with os.scandir(self.cache_path) as entries:
+                for entry in entries:
+                    # 只处理文件，不处理目录
+                    if not entry.is_file():
+                        continue
+                    
+                    # 跳过非缓存文件（保留 .json 数据文件）
+                    if entry.name.endswith('.json'):
+                        continue
+                    
+                    # 检查文件修改时间（scandir 复用同一次 stat 结果）
+                    stat = entry.stat()
+                    if now - stat.st_mtime > max_age:
+                        os.remove(entry.path)
+                        deleted_count += 1
+                        deleted_size += stat.st_size
             
             if deleted_count > 0:
                 size_mb = deleted_size / (1024 * 1024)
@@ -170,25 +348,25 @@ class GuessSongPlugin(Star):
             logger.error(f"[猜歌游戏] 缓存清理失败: {e}")
 
     # ==================== 网易云API ====================
-    async def _netease_request(self, url: str, data: dict = None, method: str = "GET") -> dict:
-        """网易云API请求"""
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Referer": "https://music.163.com/",
-            "Origin": "https://music.163.com",
-        }
-        cookies = {"appver": "2.9.11", "os": "pc"}
-        timeout = aiohttp.ClientTimeout(total=10)
-        
+    async def _netease_request(self, url: str, data: dict = None, method: str = "GET",
+                               parser=None) -> Union[dict, "simdjson.Object"]:
+        """网易云API请求（传入 simdjson 解析器时返回按需解析的文档，仅在解析器存活且未再次解析前有效）"""
         try:
             if method.upper() == "POST":
-                async with self.http_session.post(url, headers=headers, cookies=cookies, 
-                                                   data=data or {}, timeout=timeout) as resp:
-                    return await resp.json()
+                async with self.http_session.post(url, headers=NETEASE_HEADERS, cookies=NETEASE_COOKIES,
+                                                   data=data or {}, timeout=NETEASE_TIMEOUT) as resp:
+                    raw = await resp.read()
             else:
-                async with self.http_session.get(url, headers=headers, cookies=cookies,
-                                                  timeout=timeout) as resp:
-                    return await resp.json()
+                async with self.http_session.get(url, headers=NETEASE_HEADERS, cookies=NETEASE_COOKIES,
+                                                  timeout=NETEASE_TIMEOUT) as resp:
+                    raw = await resp.read()
+            if parser is not None:
+                # 按需解析：只有被访问的字段才会生成 Python 对象
+                return parser.parse(raw)
+            # 直接解析原始字节，省去先解码为 str 的中间拷贝
+            if orjson:
+                return orjson.loads(raw)
+            return ujson.loads(raw) if ujson else json.loads(raw)
         except Exception as e:
             logger.error(f"[猜歌游戏] API请求失败: {e}")
             return {}
@@ -203,19 +381,22 @@ class GuessSongPlugin(Star):
                     logger.info(f"[猜歌游戏] 加载歌单 {name}: {len(songs)} 首歌")
             except Exception as e:
                 logger.error(f"[猜歌游戏] 加载歌单 {name} 失败: {e}")
+        self.all_songs = [song for songs in self.playlist_cache.values() for song in songs]
 
     def _is_valid_song_name(self, name: str) -> bool:
         """检查歌名是否为2-7个纯中文字符"""
-        return bool(re.fullmatch(r"[\u4e00-\u9fff]{2,7}", (name or "").strip()))
+        return bool(SONG_NAME_RE.fullmatch((name or "").strip()))
 
     def _is_chinese_artist_name(self, name: str) -> bool:
         """检查歌手名是否为纯中文字符"""
-        return bool(re.fullmatch(r"[\u4e00-\u9fff]+", (name or "").strip()))
+        return bool(ARTIST_NAME_RE.fullmatch((name or "").strip()))
 
     async def _fetch_playlist(self, playlist_id: int) -> List[dict]:
         """获取歌单歌曲列表（只获取免费中文歌曲）"""
         url = f"https://music.163.com/api/playlist/detail?id={playlist_id}"
-        result = await self._netease_request(url)
+        # 歌单响应较大而每首歌只用到少数字段，有 simdjson 时按需解析
+        parser = simdjson.Parser() if simdjson else None
+        result = await self._netease_request(url, parser=parser)
         
         if not result or result.get("code") != 200:
             return []
@@ -225,7 +406,9 @@ class GuessSongPlugin(Star):
         vip_count = 0
         invalid_name_count = 0
         invalid_artist_count = 0
-        for track in tracks[:200]:  # 扫描更多歌曲以补偿被过滤的
+        # 同一歌手在歌单中反复出现，整批扫描内只校验一次
+        artist_valid: Dict[str, bool] = {}
+        for track in itertools.islice(tracks, 200):  # 扫描更多歌曲以补偿被过滤的
             # 过滤VIP歌曲：fee=0免费, fee=8低音质免费, 其他为VIP
             fee = track.get("fee", 1)
             if fee not in (0, 8):
@@ -239,8 +422,20 @@ class GuessSongPlugin(Star):
                 invalid_name_count += 1
                 continue
 
-            artist_names = [a.get("name", "").strip() for a in track.get("artists", []) if a.get("name", "").strip()]
-            if not artist_names or any(not self._is_chinese_artist_name(name) for name in artist_names):
+            # 过滤歌手：所有歌手名须为纯中文，遇到不合规的立即停止检查
+            artist_names = []
+            artists_ok = True
+            for artist in track.get("artists") or ():
+                name = (artist.get("name") or "").strip()
+                if not name:
+                    continue
+                if name not in artist_valid:
+                    artist_valid[name] = self._is_chinese_artist_name(name)
+                if not artist_valid[name]:
+                    artists_ok = False
+                    break
+                artist_names.append(name)
+            if not artists_ok or not artist_names:
                 invalid_artist_count += 1
                 continue
 
@@ -261,71 +456,128 @@ class GuessSongPlugin(Star):
         return songs
 
 
-    async def _get_random_song(self, group_id: str = "") -> Optional[dict]:
-        """随机获取一首歌，避免24小时内重复"""
-        # 合并所有歌单
-        all_songs = []
-        for songs in self.playlist_cache.values():
-            all_songs.extend(songs)
-        
-        if not all_songs:
+    async def _get_random_song(self, group_id: str = "", mark_played: bool = True) -> Optional[dict]:
+        """随机获取一首歌，避免24小时内重复（mark_played=False 时由调用方在确定播放后再记录）"""
+        if not self.all_songs:
             # 缓存为空，尝试重新加载
             await self._preload_playlists()
-            for songs in self.playlist_cache.values():
-                all_songs.extend(songs)
         
+        all_songs = self.all_songs
         if not all_songs:
             return None
         
         # 过滤24小时内已播放的歌曲
-        now = time.time()
-        one_day_ago = now - 86400  # 24小时
-        
         if group_id and group_id in self.played_songs:
-            # 清理超过24小时的记录
-            self.played_songs[group_id] = {
-                song_id: ts for song_id, ts in self.played_songs[group_id].items()
-                if ts > one_day_ago
-            }
+            played_ids = self._expire_played_songs(group_id)
+            song = None
             
-            # 过滤已播放的歌曲
-            played_ids = set(self.played_songs[group_id].keys())
-            available_songs = [s for s in all_songs if s["id"] not in played_ids]
+            # 已播放不足一半时直接随机抽取，抽中已播放的重抽，避免每轮构建候选列表
+            if len(played_ids) * 2 < len(all_songs):
+                for _ in range(REJECTION_SAMPLE_TRIES):
+                    candidate = random.choice(all_songs)
+                    if candidate["id"] not in played_ids:
+                        song = candidate
+                        break
             
-            if available_songs:
-                song = random.choice(available_songs)
-            else:
-                # 所有歌都播过了，清空记录重新开始
-                logger.info(f"[猜歌游戏] 群 {group_id} 所有歌曲已播放，重置记录")
-                self.played_songs[group_id] = {}
-                song = random.choice(all_songs)
+            if song is None:
+                # 过滤已播放的歌曲
+                available_songs = [s for s in all_songs if s["id"] not in played_ids]
+                
+                if available_songs:
+                    song = random.choice(available_songs)
+                else:
+                    # 所有歌都播过了，清空记录重新开始
+                    logger.info(f"[猜歌游戏] 群 {group_id} 所有歌曲已播放，重置记录")
+                    played_ids.clear()
+                    song = random.choice(all_songs)
         else:
             song = random.choice(all_songs)
         
         # 记录已播放
-        if group_id:
-            if group_id not in self.played_songs:
-                self.played_songs[group_id] = {}
-            self.played_songs[group_id][song["id"]] = now
+        if group_id and mark_played:
+            self._mark_played(group_id, song)
         
         return song
 
+    async def _draw_song_queue(self, group_id: str) -> List[dict]:
+        """开局时一次性抽取本局歌曲（排除24小时内已播放），每轮直接弹出"""
+        if not self.all_songs:
+            await self._preload_playlists()
+        
+        played_ids = self._expire_played_songs(group_id) if group_id in self.played_songs else {}
+        # 按ID去重（同一首歌可能同时出现在多个歌单中）
+        available_songs = list({
+            s["id"]: s for s in self.all_songs if s["id"] not in played_ids
+        }.values())
+        return random.sample(available_songs, min(self.max_rounds, len(available_songs)))
+
+    def _expire_played_songs(self, group_id: str) -> "OrderedDict[int, float]":
+        """清理超过24小时的播放记录（按时间排列，只需从头部弹出）"""
+        played_ids = self.played_songs[group_id]
+        one_day_ago = time.time() - 86400  # 24小时
+        while played_ids and next(iter(played_ids.values())) <= one_day_ago:
+            played_ids.popitem(last=False)
+        return played_ids
+
+    def _mark_played(self, group_id: str, song: dict):
+        """记录已播放歌曲"""
+        played_ids = self.played_songs.setdefault(group_id, OrderedDict())
+        played_ids[song["id"]] = time.time()
+        played_ids.move_to_end(song["id"])
+
     def _get_audio_url(self, song_id: int) -> str:
         """获取音频URL"""
         return f"https://music.163.com/song/media/outer/url?id={song_id}.mp3"
 
+    async def _is_song_available(self, song_id: int) -> bool:
+        """HEAD 请求音频外链，检查歌曲是否仍可播放（VIP/下架歌曲会跳转到404页）"""
+        now = time.time()
+        cached = self.song_alive.get(song_id)
+        if cached and now - cached[1] < SONG_CHECK_TTL:
+            return cached[0]
+        
+        try:
+            async with self.http_session.head(self._get_audio_url(song_id), headers=NETEASE_HEADERS,
+                                               cookies=NETEASE_COOKIES, allow_redirects=True,
+                                               timeout=SONG_CHECK_TIMEOUT) as resp:
+                status = resp.status
+                dead = status == 404 or resp.url.path.endswith("/404")
+        except Exception as e:
+            # 检查失败时不拦截，交由发送语音时的降级逻辑处理
+            logger.warning(f"[猜歌游戏] 检查歌曲 {song_id} 可用性失败: {e}")
+            return True
+        
+        if not dead and status != 200:
+            # 限流、服务异常等状态无法判断歌曲是否下架，按可播放处理且不缓存
+            logger.warning(f"[猜歌游戏] 检查歌曲 {song_id} 可用性返回状态 {status}，暂不判断")
+            return True
+        
+        self.song_alive[song_id] = (not dead, now)
+        return not dead
+
     # ==================== 工具方法 ====================
     def _get_group_id(self, event: AstrMessageEvent) -> str:
-        """获取群组ID"""
-        if hasattr(event, 'message_obj') and hasattr(event.message_obj, 'group_id'):
-            return str(event.message_obj.group_id) if event.message_obj.group_id else ""
-        return ""
+        """获取群组ID（结果缓存在事件上，同一消息经过多个处理器时只解析一次）"""
+        group_id = getattr(event, "_guess_song_group_id", None)
+        if group_id is None:
+            raw_group_id = getattr(getattr(event, "message_obj", None), "group_id", None)
+            group_id = str(raw_group_id) if raw_group_id else ""
+            event._guess_song_group_id = group_id
+        return group_id
 
     def _get_user_info(self, event: AstrMessageEvent) -> tuple:
-        """获取用户ID和昵称"""
-        user_id = str(event.get_sender_id())
-        nickname = event.get_sender_name() or f"用户{user_id[-4:]}"
-        return user_id, nickname
+        """获取用户ID和昵称（结果缓存在事件上）"""
+        user_info = getattr(event, "_guess_song_user_info", None)
+        if user_info is None:
+            user_id = str(event.get_sender_id())
+            nickname = event.get_sender_name() or f"用户{user_id[-4:]}"
+            user_info = event._guess_song_user_info = (user_id, nickname)
+        return user_info
+
+    def _cancel_task(self, task: Optional[Union[asyncio.Task, asyncio.TimerHandle]]):
+        """取消后台任务或定时回调（跳过当前正在执行的任务，避免在超时任务内进入下一轮时中断自身）"""
+        if task and task is not asyncio.current_task():
+            task.cancel()
 
     def _get_session(self, group_id: str) -> GameSession:
         """获取或创建游戏会话"""
@@ -333,23 +585,23 @@ class GuessSongPlugin(Star):
             self.sessions[group_id] = GameSession(group_id=group_id)
         return self.sessions[group_id]
 
-    def _get_hint(self, song_name: str, level: int) -> str:
-        """生成提示（逐步揭示）"""
-        if level <= 0:
-            return "＊" * len(song_name)
-        
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def _get_hint(song_name: str, level: int) -> str:
+        """生成提示（逐步揭示，结果按歌名和等级缓存）"""
         # 每级揭示一个字
-        revealed = min(level, len(song_name))
-        hint = list("＊" * len(song_name))
-        for i in range(revealed):
-            hint[i] = song_name[i]
-        return "".join(hint)
+        revealed = min(max(level, 0), len(song_name))
+        hidden = len(song_name) - revealed
+        stars = HINT_STARS[hidden] if hidden < len(HINT_STARS) else "＊" * hidden
+        return song_name[:revealed] + stars
+
+    def _normalize_answer(self, text: str) -> str:
+        """标准化答案：去空白、转小写（translate 一次完成去除，避免多次创建中间字符串）"""
+        return text.translate(ANSWER_STRIP_TABLE).lower()
 
     def _check_answer(self, user_input: str, correct_answer: str) -> bool:
-        """检查答案是否正确"""
-        # 标准化：去空格、转小写
-        user_input = user_input.strip().lower().replace(" ", "")
-        correct_answer = correct_answer.strip().lower().replace(" ", "")
+        """检查答案是否正确（correct_answer 须已标准化，每轮开始时计算一次）"""
+        user_input = self._normalize_answer(user_input)
         
         # 完全匹配
         if user_input == correct_answer:
@@ -370,39 +622,112 @@ class GuessSongPlugin(Star):
         """获取排行榜文件路径"""
         return os.path.join(DATA_DIR, f"stats_{group_id}.json")
 
-    def _load_stats(self, group_id: str) -> dict:
-        """加载排行榜"""
+    async def _load_stats(self, group_id: str) -> dict:
+        """加载排行榜（优先读取内存缓存，未命中时在线程池中读取文件）"""
+        if group_id in self.stats_cache:
+            return self.stats_cache[group_id]
+        stats = await asyncio.to_thread(self._read_stats, group_id)
+        # 等待读取期间可能已有其他协程加载过，以先加载的为准
+        return self.stats_cache.setdefault(group_id, stats)
+
+    def _save_stats(self, group_id: str, data: dict):
+        """保存排行榜（写入内存缓存，由落盘任务定时写入文件）"""
+        self.stats_cache[group_id] = data
+        self.stats_dirty.add(group_id)
+
+    async def _flush_stats(self):
+        """将脏数据写入文件（在事件循环中序列化，线程池中写盘）"""
+        while self.stats_dirty:
+            group_id = self.stats_dirty.pop()
+            raw = self._dump_stats(self.stats_cache[group_id])
+            await asyncio.to_thread(self._write_stats, group_id, raw)
+
+    async def _run_stats_flush_task(self):
+        """定时落盘排行榜任务"""
+        while True:
+            try:
+                await asyncio.sleep(STATS_FLUSH_INTERVAL)
+                await self._flush_stats()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[猜歌游戏] 排行榜落盘任务异常: {e}")
+
+    def _read_stats(self, group_id: str) -> dict:
+        """从文件读取排行榜"""
         path = self._get_stats_path(group_id)
         try:
             if os.path.exists(path):
+                if orjson or ujson:
+                    with open(path, "rb") as f:
+                        return (orjson or ujson).loads(f.read())
                 with open(path, "r", encoding="utf-8") as f:
                     return json.load(f)
         except Exception as e:
             logger.error(f"[猜歌游戏] 加载排行榜失败: {e}")
         return {"users": {}}
 
-    def _save_stats(self, group_id: str, data: dict):
-        """保存排行榜"""
+    def _dump_stats(self, data: dict) -> bytes:
+        """序列化排行榜"""
+        if orjson:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        if ujson:
+            return ujson.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def _write_stats(self, group_id: str, raw: bytes):
+        """写入排行榜文件"""
         path = self._get_stats_path(group_id)
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with open(path, "wb") as f:
+                f.write(raw)
         except Exception as e:
             logger.error(f"[猜歌游戏] 保存排行榜失败: {e}")
 
-    def _add_score(self, group_id: str, user_id: str, nickname: str, points: int = 1):
-        """增加得分（历史总榜）"""
-        stats = self._load_stats(group_id)
-        users = stats.setdefault("users", {})
+    async def _add_scores_bulk(self, group_id: str, entries: List[tuple]):
+        """批量增加得分（历史总榜），entries: [(user_id, nickname, points)]"""
+        if not entries:
+            return
         
-        if user_id not in users:
-            users[user_id] = {"nickname": nickname, "score": 0, "wins": 0}
+        stats = await self._load_stats(group_id)
+        users = stats.setdefault("users", {})
         
-        users[user_id]["score"] += points
-        users[user_id]["wins"] += 1
-        users[user_id]["nickname"] = nickname  # 更新昵称
+        for user_id, nickname, points in entries:
+            if user_id not in users:
+                users[user_id] = {"nickname": nickname, "score": 0, "wins": 0}
+            
+            users[user_id]["score"] += points
+            users[user_id]["wins"] += 1
+            users[user_id]["nickname"] = nickname  # 更新昵称
         
         self._save_stats(group_id, stats)
+        # 得分变化后排行榜需重新生成
+        self.ranking_cache.pop(group_id, None)
+
+    async def _render_leaderboard(self, group_id: str) -> str:
+        """生成排行榜文本（缓存至下次得分写入），无数据时返回空字符串"""
+        if group_id in self.ranking_cache:
+            return self.ranking_cache[group_id]
+        
+        stats = await self._load_stats(group_id)
+        users = stats.get("users", {})
+        if not users:
+            return ""
+        
+        # 按得分取前10名（只维护大小为10的堆，无需对全部用户排序）
+        top_users = heapq.nlargest(10, users.items(), key=lambda x: x[1].get("score", 0))
+        
+        lines = ["🏆 【猜歌排行榜】", ""]
+        for i, (uid, data) in enumerate(top_users, 1):
+            nickname = data.get("nickname", f"用户{uid[-4:]}")
+            score = data.get("score", 0)
+            wins = data.get("wins", 0)
+            medal = MEDALS[i-1] if i <= len(MEDALS) else f"{i}."
+            lines.append(f"{medal} {nickname}: {score}分 ({wins}胜)")
+        
+        text = "\n".join(lines)
+        self.ranking_cache[group_id] = text
+        return text
 
     # ==================== 游戏核心逻辑 ====================
     async def _start_game(self, event: AstrMessageEvent, group_id: str):
@@ -412,6 +737,7 @@ class GuessSongPlugin(Star):
         session.status = "playing"
         session.round_num = 0
         session.start_time = time.time()
+        session.song_queue = await self._draw_song_queue(group_id)
         
         # 生成参与者列表
         player_list = ", ".join([data["name"] for data in session.participants.values()])
@@ -427,11 +753,25 @@ class GuessSongPlugin(Star):
         # 开始第一轮
         await self._next_round(event, group_id)
 
+    async def _pick_next_song(self, session: GameSession) -> Optional[dict]:
+        """取出下一轮歌曲：优先本局歌曲队列，队列不足时（可选歌曲少于轮数）再随机获取，跳过不可播放的歌曲"""
+        # 返回的歌曲由 _next_round 记录为已播放，被跳过的歌曲不计入播放记录；连续多首不可播放时返回 None
+        for _ in range(SONG_CHECK_TRIES):
+            if session.song_queue:
+                song = session.song_queue.pop()
+            else:
+                song = await self._get_random_song(session.group_id, mark_played=False)
+            if not song or await self._is_song_available(song["id"]):
+                return song
+            logger.info(f"[猜歌游戏] 歌曲《{song['name']}》无法播放，已跳过")
+        return None
+
     async def _next_round(self, event: AstrMessageEvent, group_id: str):
         """进入下一轮"""
         session = self.sessions.get(group_id)
         if not session:
             return
+        session.last_active = time.time()
         
         next_round = session.round_num + 1
         
@@ -440,21 +780,30 @@ class GuessSongPlugin(Star):
             await self._end_game(event, group_id)
             return
         
-        # 获取随机歌曲
-        song = await self._get_random_song(group_id)
+        # 优先使用上一轮期间预取的歌曲
+        if session.next_song_task:
+            song = await session.next_song_task
+            session.next_song_task = None
+        else:
+            song = await self._pick_next_song(session)
         if not song:
             await event.send(event.plain_result("❌ 无法获取歌曲，游戏结束。"))
             await self._end_game(event, group_id)
             return
+        self._mark_played(group_id, song)
+        
+        # 本轮进行期间预取下一轮歌曲
+        if next_round < self.max_rounds:
+            session.next_song_task = asyncio.create_task(self._pick_next_song(session))
         
         session.current_song = song
+        session.answer_norm = self._normalize_answer(song["name"])
         session.hint_level = 0
         session.round_num = next_round
         session.round_answered = False  # 重置本轮答对标志
         
         # 取消之前的超时任务
-        if session.timeout_task:
-            session.timeout_task.cancel()
+        self._cancel_task(session.timeout_task)
         
         # 发送音频
         audio_url = self._get_audio_url(song["id"])
@@ -506,26 +855,68 @@ class GuessSongPlugin(Star):
             self._round_timeout(event, group_id)
         )
 
+    def _schedule_next_round(self, event: AstrMessageEvent, group_id: str, delay: float = 2,
+                             announcement: str = ""):
+        """延迟后进入下一轮（定时回调，等待期间不占用协程；游戏结束时可取消），可先发送本轮结果"""
+        session = self.sessions.get(group_id)
+        if not session:
+            return
+        announce_task = None
+        if announcement:
+            announce_task = asyncio.create_task(self._send_announcement(event, announcement))
+        session.announce_task = announce_task
+        session.next_round_handle = asyncio.get_running_loop().call_later(
+            delay, self._start_next_round, event, group_id, announce_task
+        )
+
+    async def _send_announcement(self, event: AstrMessageEvent, text: str):
+        """发送本轮结果（失败只记录日志，不影响进入下一轮）"""
+        try:
+            await event.send(event.plain_result(text))
+        except Exception as e:
+            logger.error(f"[猜歌游戏] 发送消息失败: {e}")
+
+    def _start_next_round(self, event: AstrMessageEvent, group_id: str,
+                          announce_task: Optional[asyncio.Task]):
+        """定时回调：启动进入下一轮的任务"""
+        session = self.sessions.get(group_id)
+        if not session:
+            return
+        session.next_round_handle = None
+        session.next_round_task = asyncio.create_task(
+            self._run_next_round(event, group_id, announce_task)
+        )
+
+    async def _run_next_round(self, event: AstrMessageEvent, group_id: str,
+                              announce_task: Optional[asyncio.Task]):
+        """进入下一轮（本轮结果尚未发出时先等待，保证消息顺序）"""
+        try:
+            if announce_task:
+                await announce_task
+            await self._next_round(event, group_id)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"[猜歌游戏] 进入下一轮异常: {e}")
+
     async def _round_timeout(self, event: AstrMessageEvent, group_id: str):
         """回合超时处理"""
         try:
             await asyncio.sleep(self.round_timeout)
             
             session = self.sessions.get(group_id)
-            if not session or session.status != "playing":
+            if not session or session.status != "playing" or session.round_answered:
                 return
             
+            # 认领本轮，超时公布答案后的抢答不再计分
+            session.round_answered = True
             song = session.current_song
             
-            # 发送超时消息
-            await event.send(event.plain_result(
+            # 发送超时消息并延迟进入下一轮
+            self._schedule_next_round(event, group_id, announcement=(
                 f"⏰ 时间到！\n答案是：《{song['name']}》- {song['artist']}\n\n正在进入下一轮..."
             ))
             
-            # 进入下一轮
-            await asyncio.sleep(2)
-            await self._next_round(event, group_id)
-            
         except asyncio.CancelledError:
             pass
         except Exception as e:
@@ -537,18 +928,22 @@ class GuessSongPlugin(Star):
         if not session:
             return
         
-        # 取消超时任务
-        if session.timeout_task:
-            session.timeout_task.cancel()
+        # 取消超时、预取及待进入下一轮的任务
+        self._cancel_task(session.timeout_task)
+        self._cancel_task(session.next_song_task)
+        self._cancel_task(session.next_round_handle)
+        self._cancel_task(session.next_round_task)
         
         session.status = "ended"
+        session.last_active = time.time()
         
         # 获取本局得分
         scores = session.participants
         
         if not scores:
             await event.send(event.plain_result("🎵 【猜歌游戏结束】\n本局无人参与"))
-            del self.sessions[group_id]
+            if self.sessions.get(group_id) is session:
+                del self.sessions[group_id]
             return
         
         # 生成本轮得分
@@ -559,14 +954,16 @@ class GuessSongPlugin(Star):
         
         if sorted_scores:
             lines.append("📊 本局得分：")
+            score_entries = []
             for i, (uid, data) in enumerate(sorted_scores, 1):
                 score = data.get("score", 0)
                 nickname = data.get("name", f"用户{uid[-4:]}")
-                medal = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"{i}."
+                medal = MEDALS[i-1] if i <= len(MEDALS) else f"{i}."
                 lines.append(f"{medal} {nickname}: {score}分")
                 # 保存到历史排行榜（只保存得分者）
                 if score > 0:
-                    self._add_score(group_id, uid, nickname, score)
+                    score_entries.append((uid, nickname, score))
+            await self._add_scores_bulk(group_id, score_entries)
             
             # 真心话/大冒险逻辑（至少2人参与，包括0分的人）
             if len(sorted_scores) >= 2:
@@ -597,8 +994,9 @@ class GuessSongPlugin(Star):
         
         await event.send(event.plain_result("\n".join(lines)))
         
-        # 清理会话
-        del self.sessions[group_id]
+        # 清理会话（结算期间本群可能已开了新局，只移除本局会话）
+        if self.sessions.get(group_id) is session:
+            del self.sessions[group_id]
 
     # ==================== 命令处理 ====================
     @filter.command("猜歌")
@@ -748,11 +1146,17 @@ class GuessSongPlugin(Star):
             yield event.plain_result("❌ 当前没有进行中的猜歌游戏。")
             return
         
+        # 本轮已被答对时不再重复进入下一轮
+        if session.round_answered:
+            yield event.plain_result("❌ 本轮答案已公布，正在进入下一轮。")
+            return
+        
+        # 认领本轮，公布答案后的抢答不再计分
+        session.round_answered = True
         song = session.current_song
         
         # 取消超时任务
-        if session.timeout_task:
-            session.timeout_task.cancel()
+        self._cancel_task(session.timeout_task)
         
         yield event.plain_result(
             f"📢 管理员公布答案\n"
@@ -760,8 +1164,7 @@ class GuessSongPlugin(Star):
             f"正在进入下一轮..."
         )
         
-        await asyncio.sleep(2)
-        await self._next_round(event, group_id)
+        self._schedule_next_round(event, group_id)
 
     @filter.command("猜歌退出")
     async def cmd_end_game(self, event: AstrMessageEvent):
@@ -824,107 +1227,80 @@ class GuessSongPlugin(Star):
             yield event.plain_result("❌ 仅支持群聊使用。")
             return
         
-        stats = self._load_stats(group_id)
-        users = stats.get("users", {})
-        
-        if not users:
+        text = await self._render_leaderboard(group_id)
+        if not text:
             yield event.plain_result("📊 暂无排行榜数据，快来玩猜歌游戏吧！")
             return
         
-        # 按得分排序
-        sorted_users = sorted(users.items(), key=lambda x: x[1].get("score", 0), reverse=True)
-        
-        lines = ["🏆 【猜歌排行榜】", ""]
-        for i, (uid, data) in enumerate(sorted_users[:10], 1):
-            nickname = data.get("nickname", f"用户{uid[-4:]}")
-            score = data.get("score", 0)
-            wins = data.get("wins", 0)
-            medal = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"{i}."
-            lines.append(f"{medal} {nickname}: {score}分 ({wins}胜)")
-        
-        yield event.plain_result("\n".join(lines))
+        yield event.plain_result(text)
 
 
     @filter.command("猜歌帮助")
     async def cmd_help(self, event: AstrMessageEvent):
         """显示帮助"""
-        yield event.plain_result(
-            f"🎵 【猜歌游戏帮助】\n"
-            f"━━━━━━━━━━━━━━━━━━\n"
-            f"📌 命令列表：\n"
-            f"  #猜歌 - 创建游戏\n"
-            f"  🎶 - 加入游戏\n"
-            f"  #开始猜歌 - 开始游戏\n"
-            f"  #猜歌提示 - 获取提示\n"
-            f"  #猜歌答案 - 公布答案（管理员）\n"
-            f"  #猜歌结束 - 强制结束（管理员）\n"
-            f"  #猜歌排行 - 查看历史排行榜\n"
-            f"  #猜歌退出 - 结束游戏\n"
-            f"━━━━━━━━━━━━━━━━━━\n"
-            f"💡 玩法：\n"
-            f"1. 发送 #猜歌 创建游戏\n"
-            f"2. 群友发送 🎶 加入\n"
-            f"3. 发送 #开始猜歌 开始\n"
-            f"4. 直接发送歌名抢答\n"
-            f"5. 答对自动下一轮！\n\n"
-            f"🎭 游戏结束后：\n"
-            f"最高分向最低分发起真心话/大冒险挑战！"
-        )
+        yield event.plain_result(HELP_TEXT)
 
 
     # ==================== 消息监听 ====================
     @filter.event_message_type(filter.EventMessageType.ALL)
     async def on_message(self, event: AstrMessageEvent):
         """监听所有消息：处理🎶加入、直接猜答案"""
-        text = event.message_str.strip() if event.message_str else ""
-        if not text:
-            return
-        
         group_id = self._get_group_id(event)
         if not group_id:
             return
         
-        # 检查是否有游戏
+        # 检查是否有游戏（绝大多数消息到此为止，无需处理文本）
         session = self.sessions.get(group_id)
         if not session:
             return
+        session.last_active = time.time()
+        
+        raw_text = event.message_str
+        if not raw_text:
+            return
+        text = raw_text.strip()
+        if not text:
+            return
         
         user_id, nickname = self._get_user_info(event)
         status = session.status
+        participants = session.participants
         
         # ========== 处理 🎶 加入游戏 ==========
-        if "🎶" in text and status in {"waiting", "playing"}:
+        # 纯 ASCII 消息不可能包含 🎶，isascii() 读取字符串自带的标记，无需扫描
+        if not text.isascii() and JOIN_EMOJI in text and status in JOIN_STATES:
             # 检查是否已加入
-            if user_id in session.participants:
+            if user_id in participants:
                 yield event.plain_result("❌ 你已经加入了")
                 return
             
             # 检查人数上限
-            if len(session.participants) >= self.max_players:
+            count = len(participants)
+            if count >= self.max_players:
                 yield event.plain_result(f"❌ 人数已满 ({self.max_players}人)")
                 return
             
             # 加入游戏
-            session.participants[user_id] = {"name": nickname, "score": 0}
-            count = len(session.participants)
+            participants[user_id] = {"name": nickname, "score": 0}
+            count += 1
             
-            if status == "waiting":
-                yield event.plain_result(
-                    f"✅ {nickname} 加入成功 ({count}人)\n"
-                    f"💡 发送「#开始猜歌」开始游戏"
-                )
-            else:
-                yield event.plain_result(f"✅ {nickname} 中途加入成功 ({count}人)")
+            waiting = status == "waiting"
+            yield event.plain_result(JOIN_SUCCESS_TEMPLATE.format(
+                nickname=nickname,
+                action="加入" if waiting else "中途加入",
+                count=count,
+                tip=JOIN_WAITING_TIP if waiting else "",
+            ))
             return
         
         # ========== 处理直接猜答案（游戏进行中）==========
         if status == "playing":
-            correct_answer = session.current_song.get("name", "")
+            correct_answer = session.answer_norm
             if not correct_answer:
                 return
             
             # 忽略命令
-            if text.startswith("#") or text.startswith("/"):
+            if text[:1] in COMMAND_PREFIXES:
                 return
             
             # 检查答案
@@ -934,32 +1310,27 @@ class GuessSongPlugin(Star):
                     return  # 本轮已被答对，忽略后续答案
                 
                 # 必须加入游戏才可提交答案
-                if user_id not in session.participants:
+                if user_id not in participants:
                     await event.send(event.plain_result("❌ 请先发送 🎶 加入游戏"))
                     return
                 
                 # 标记本轮已被答对（只有第一个答对的人得分）
+                # 检查与标记之间不能有 await，单事件循环下即为原子认领
                 session.round_answered = True
                 
                 # 答对了！取消超时任务
-                if session.timeout_task:
-                    session.timeout_task.cancel()
+                self._cancel_task(session.timeout_task)
                 
                 # 记录得分
-                session.participants[user_id]["score"] = session.participants[user_id].get("score", 0) + 1
-                total_score = session.participants[user_id]["score"]
+                player = participants[user_id]
+                player["score"] += 1
+                total_score = player["score"]
                 
                 song = session.current_song
                 
-                await event.send(event.plain_result(
-                    f"🎉 恭喜 {nickname} 答对了！\n"
-                    f"答案：《{song['name']}》- {song['artist']}\n"
-                    f"本轮得分：+1  总分：{total_score}\n\n"
-                    f"正在进入下一轮..."
+                # 发送祝贺并进入下一轮（后台执行，不阻塞消息处理）
+                self._schedule_next_round(event, group_id, announcement=CORRECT_ANSWER_TEMPLATE.format(
+                    nickname=nickname, name=song["name"], artist=song["artist"], total=total_score
                 ))
-                
-                # 进入下一轮
-                await asyncio.sleep(2)
-                await self._next_round(event, group_id)
                 event.stop_event()
                 return